@@ -1 +1,3 @@
-from .scratch import Project, Stage, Sprite, Sound, Costume, RotationStyles
+from .scratch import Project, Stage, Sprite, Sound, Costume, RotationStyles, build_many
+from .analysis import analyze, analyze_target
+from .interpreter import run
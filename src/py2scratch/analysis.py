@@ -0,0 +1,170 @@
+import json, inspect, warnings
+from collections import Counter
+from typing import NamedTuple, Callable
+from .scratch import Project, Target
+from .errors import *
+
+PROJECT_JSON_LIMIT = 5 * 1024 * 1024
+ASSET_LIMIT = 10 * 1024 * 1024
+FRAME_COST_LIMIT = 5000
+WARN_RATIO = 0.8
+
+# Blocks that give the frame back to the VM before the script can continue.
+YIELDING_OPCODES = {'sensing_askandwait'}
+
+class ScriptReport(NamedTuple):
+    func: Callable
+    hat_opcode: str
+    opcodes: Counter
+    temp_variables: int
+    serialized_bytes: int
+    frame_costs: list[int]
+
+    @property
+    def block_count(self):
+        return sum(self.opcodes.values())
+
+    @property
+    def frame_cost(self):
+        return max(self.frame_costs, default=0)
+
+    @property
+    def location(self):
+        return func_location(self.func)
+
+class TargetReport(NamedTuple):
+    name: str
+    scripts: list[ScriptReport]
+    serialized_bytes: int
+    asset_bytes: int
+
+    @property
+    def opcodes(self):
+        return sum((script.opcodes for script in self.scripts), Counter())
+
+class ProjectReport(NamedTuple):
+    targets: list[TargetReport]
+    serialized_bytes: int
+    asset_bytes: int
+    warnings: list[str]
+
+    def __str__(self):
+        lines = [f'project.json: {self.serialized_bytes} bytes ({self.serialized_bytes / PROJECT_JSON_LIMIT:.1%} of limit), assets: {self.asset_bytes} bytes']
+        for target in self.targets:
+            lines.append(f'{target.name}: {target.serialized_bytes} bytes, {target.asset_bytes} asset bytes')
+            for script in target.scripts:
+                lines.append(f'  {script.func.__name__} ({script.location}) [{script.hat_opcode}]: '
+                             f'{script.block_count} blocks, {script.temp_variables} temp variables, '
+                             f'{script.serialized_bytes} bytes, ~{script.frame_cost} block evals/frame')
+                for opcode, count in script.opcodes.most_common():
+                    lines.append(f'    {opcode}: {count}')
+        lines.extend(f'WARNING: {warning}' for warning in self.warnings)
+        return '\n'.join(lines)
+
+def func_location(func: Callable):
+    try:
+        return f'{inspect.getsourcefile(func)}:{func.__code__.co_firstlineno}'
+    except (TypeError, AttributeError):
+        return '<unknown>'
+
+def serialized_size(obj) -> int:
+    return len(json.dumps(obj).encode())
+
+def input_reporters(block: dict, blocks: dict):
+    """ Yields the opcode of every reporter evaluated for the inputs of `block`. """
+    for value in block.get('inputs', {}).values():
+        if value[0] == 1:
+            continue
+        match value[1]:
+            case [12, *_]:
+                yield 'data_variable'
+            case [13, *_]:
+                yield 'data_listcontents'
+            case str() as reporter_id if reporter_id in blocks:
+                yield blocks[reporter_id]['opcode']
+                yield from input_reporters(blocks[reporter_id], blocks)
+
+def frame_costs(hat_id: str, blocks: dict):
+    # Every evaluated block (hat, stack block, reporter or variable read) counts as 1,
+    # the same way `interpreter.run` counts executed blocks.
+    costs = [1]
+    block_id = blocks[hat_id]['next']
+    while block_id is not None:
+        block = blocks[block_id]
+        costs[-1] += 1 + sum(1 for _ in input_reporters(block, blocks))
+        if block['opcode'] in YIELDING_OPCODES:
+            costs.append(0)
+        block_id = block['next']
+    return costs
+
+def analyze_script(func: Callable, blocks: dict):
+    opcodes = Counter(block['opcode'] for block in blocks.values())
+    for block in blocks.values():
+        for value in block['inputs'].values():
+            match value:
+                case [1, *_]:
+                    continue
+                case [_, [12, *_], *_]:
+                    opcodes['data_variable'] += 1
+    temp_variables = {
+        block['fields']['VARIABLE'][1] for block in blocks.values()
+        if 'VARIABLE' in block['fields'] and block['fields']['VARIABLE'][0].startswith('tmp-')
+    }
+    hats = [block_id for block_id, block in blocks.items() if block['topLevel']]
+    return ScriptReport(
+        func=func,
+        hat_opcode=blocks[hats[0]]['opcode'] if hats else '',
+        opcodes=+opcodes,
+        temp_variables=len(temp_variables),
+        serialized_bytes=serialized_size(blocks),
+        frame_costs=[cost for hat_id in hats for cost in frame_costs(hat_id, blocks)],
+    )
+
+def analyze_target(target: Target):
+    if target.compiled is None:
+        raise ProjectNotBuilt(f'{target.name} has not been compiled yet, call `json()` or `Project.build()` first!')
+    return TargetReport(
+        name=target.name,
+        scripts=[analyze_script(func, blocks) for func, blocks in target.scripts],
+        serialized_bytes=serialized_size(target.compiled),
+        asset_bytes=sum(len(asset.data) for asset in [*target.costumes, *target.sounds]),
+    )
+
+def check_limits(project: Project, report: ProjectReport):
+    found = []
+    if report.serialized_bytes >= PROJECT_JSON_LIMIT * WARN_RATIO:
+        scripts = [script for target in report.targets for script in target.scripts]
+        biggest = max(scripts, key=lambda script: script.serialized_bytes, default=None)
+        found.append(
+            f'project.json is {report.serialized_bytes} bytes, Scratch rejects projects over {PROJECT_JSON_LIMIT} bytes.'
+            + (f' Largest script is `{biggest.func.__name__}` ({biggest.location}) at {biggest.serialized_bytes} bytes.' if biggest else '')
+        )
+    for dependency in project.dependencies:
+        for asset in [*dependency.costumes, *dependency.sounds]:
+            if len(asset.data) >= ASSET_LIMIT * WARN_RATIO:
+                found.append(f'Asset {asset.name!r} ({asset.path}) of {dependency.name} is {len(asset.data)} bytes, Scratch rejects assets over {ASSET_LIMIT} bytes.')
+    for target in report.targets:
+        for script in target.scripts:
+            if script.frame_cost >= FRAME_COST_LIMIT * WARN_RATIO:
+                found.append(f'`{script.func.__name__}` ({script.location}) of {target.name} runs ~{script.frame_cost} blocks in one frame and will likely lag.')
+    return found
+
+def analyze(project: Project, warn: bool = True):
+    if project.project_json is None:
+        raise ProjectNotBuilt('Project has not been built yet, call `Project.build()` first!')
+    unique_assets = {
+        asset.hash: len(asset.data)
+        for dependency in project.dependencies
+        for asset in [*dependency.costumes, *dependency.sounds]
+    }
+    report = ProjectReport(
+        targets=[analyze_target(dependency) for dependency in project.dependencies],
+        serialized_bytes=len(project.project_json.encode()),
+        asset_bytes=sum(unique_assets.values()),
+        warnings=[],
+    )
+    report.warnings.extend(check_limits(project, report))
+    if warn:
+        for warning in report.warnings:
+            warnings.warn(warning, ResourceWarning)
+    return report
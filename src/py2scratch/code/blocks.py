@@ -9,6 +9,15 @@ all_lists = {}
 
 all_variables_ref = []
 
+def reset_inline_blocks():
+    inline_blocks.clear()
+
+def reset_state():
+    reset_inline_blocks()
+    all_variables.clear()
+    all_lists.clear()
+    all_variables_ref.clear()
+
 class ScratchBlock:
     @abc.abstractmethod
     def json(self):
@@ -13,3 +13,11 @@ class TypeUninferrable(PyToScratchError):
 class InvalidAudioFile(PyToScratchError):
     """ Invalid Audio File """
 
+class ProjectNotBuilt(PyToScratchError):
+    """ The project/target has not been compiled yet. """
+class UnsupportedOpcode(PyToScratchError):
+    """ The interpreter does not know how to run this block. """
+class NoAnswersLeft(PyToScratchError):
+    """ An `ask and wait` block ran out of scripted answers. """
+class InvalidSpriteSheet(PyToScratchError):
+    """ The sprite sheet can't be sliced into the requested frames. """
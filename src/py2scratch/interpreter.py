@@ -0,0 +1,256 @@
+import json, math, os, pathlib, re, zipfile, copy
+from collections import Counter
+from decimal import Decimal
+from typing import NamedTuple, Iterable
+from .scratch import Project, main_dir
+from .errors import *
+
+NUMBER = re.compile(r'[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][+-]?[0-9]+)?')
+RADIX_NUMBER = re.compile(r'0[xX][0-9a-fA-F]+|0[oO][0-7]+|0[bB][01]+')
+RADIX = {'x': 16, 'o': 8, 'b': 2}
+# Whitespace removed by JavaScript's `String.prototype.trim`, `str.strip()` would also remove \x1c-\x1f.
+JS_WHITESPACE = '\t\n\v\f\r \u00a0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000\ufeff'
+DONE = object()
+
+class RunResult(NamedTuple):
+    output: list[str]
+    questions: list[str]
+    variables: dict[str, dict[str, object]]
+    opcodes: Counter
+    frames: int
+    finished: bool
+
+    @property
+    def blocks(self):
+        return sum(self.opcodes.values())
+
+# Casting follows scratch-vm's `Cast`, which in turn follows JavaScript's `Number()`/`String()`.
+def js_number(value) -> float:
+    if isinstance(value, (bool, int, float)):
+        return float(value)
+    text = str(value).strip(JS_WHITESPACE)
+    if text == '':
+        return 0.0
+    if NUMBER.fullmatch(text):
+        return float(text)
+    if text in ('Infinity', '+Infinity', '-Infinity'):
+        return -math.inf if text.startswith('-') else math.inf
+    if RADIX_NUMBER.fullmatch(text):
+        return float(int(text[2:], RADIX[text[1].lower()]))
+    return math.nan
+
+def to_number(value) -> float:
+    number = js_number(value)
+    return 0.0 if math.isnan(number) else number
+
+def to_string(value) -> str:
+    match value:
+        case bool():
+            return 'true' if value else 'false'
+        case float() | int():
+            if math.isnan(value):
+                return 'NaN'
+            if math.isinf(value):
+                return 'Infinity' if value > 0 else '-Infinity'
+            return js_float_string(float(value))
+        case _:
+            return str(value)
+
+def js_float_string(value: float) -> str:
+    """ `Number.prototype.toString` for finite numbers, `repr` already gives the shortest round-trip digits. """
+    if value == 0:
+        return '0'
+    sign = '-' if value < 0 else ''
+    _, digit_tuple, exponent = Decimal(repr(abs(value))).as_tuple()
+    digits = ''.join(map(str, digit_tuple)).rstrip('0')
+    # value = 0.<digits> * 10 ** point
+    point = len(digit_tuple) + exponent
+    if len(digits) <= point <= 21:
+        return sign + digits + '0' * (point - len(digits))
+    if 0 < point <= 21:
+        return sign + digits[:point] + '.' + digits[point:]
+    if -6 < point <= 0:
+        return sign + '0.' + '0' * -point + digits
+    mantissa = digits[0] + ('.' + digits[1:] if len(digits) > 1 else '')
+    return f'{sign}{mantissa}e{"+" if point > 0 else "-"}{abs(point - 1)}'
+
+def to_boolean(value) -> bool:
+    match value:
+        case bool():
+            return value
+        case float() | int():
+            return value != 0 and not math.isnan(value)
+        case _:
+            return str(value).lower() not in ('', '0', 'false')
+
+def compare(left, right) -> float:
+    n1, n2 = js_number(left), js_number(right)
+    if (n1 == 0 and str(left).strip(JS_WHITESPACE) == '') or (n2 == 0 and str(right).strip(JS_WHITESPACE) == ''):
+        n1 = n2 = math.nan
+    if math.isnan(n1) or math.isnan(n2):
+        s1, s2 = to_string(left).lower(), to_string(right).lower()
+        return (s1 > s2) - (s1 < s2)
+    if n1 == n2:
+        return 0
+    return n1 - n2
+
+def js_mod(left: float, right: float) -> float:
+    # scratch-vm takes JavaScript's truncating `%` and then moves the result to the sign of the divisor.
+    if right == 0 or math.isinf(left) or math.isnan(left) or math.isnan(right):
+        return math.nan
+    result = math.fmod(left, right)
+    if result / right < 0:
+        result += right
+    return result
+
+def js_divide(left: float, right: float) -> float:
+    if right == 0:
+        return math.nan if left == 0 or math.isnan(left) else math.copysign(math.inf, left) * math.copysign(1, right)
+    return left / right
+
+class Interpreter:
+    def __init__(self, project: dict, answers: Iterable[str] = ()):
+        self.targets = copy.deepcopy(project['targets'])
+        self.stage = next((target for target in self.targets if target['isStage']), None)
+        self.answers = iter(answers)
+        self.answer = ''
+        self.output: list[str] = []
+        self.questions: list[str] = []
+        self.opcodes = Counter()
+        self.frames = 0
+
+    def run(self, max_frames: int = 10_000):
+        threads = [
+            self.script(target, block_id)
+            for target in self.targets
+            for block_id, block in target['blocks'].items()
+            if block['topLevel'] and block['opcode'] == 'event_whenflagclicked'
+        ]
+        while threads and self.frames < max_frames:
+            self.frames += 1
+            threads = [thread for thread in threads if next(thread, DONE) is not DONE]
+        return RunResult(
+            output=self.output,
+            questions=self.questions,
+            variables={target['name']: {name: value for name, value in target['variables'].values()} for target in self.targets},
+            opcodes=self.opcodes,
+            frames=self.frames,
+            finished=not threads,
+        )
+
+    def script(self, target: dict, hat_id: str):
+        blocks = target['blocks']
+        self.opcodes[blocks[hat_id]['opcode']] += 1
+        block_id = blocks[hat_id]['next']
+        while block_id is not None:
+            block = blocks[block_id]
+            yield from self.execute(target, block)
+            block_id = block['next']
+
+    def variable(self, target: dict, field: list[str]) -> list:
+        name, idx = field[:2]
+        for owner in (target, self.stage):
+            if owner is not None and idx in owner['variables']:
+                return owner['variables'][idx]
+        target['variables'][idx] = [name, 0]
+        return target['variables'][idx]
+
+    def execute(self, target: dict, block: dict):
+        self.opcodes[block['opcode']] += 1
+        match block['opcode']:
+            case 'data_setvariableto':
+                self.variable(target, block['fields']['VARIABLE'])[1] = self.evaluate(target, block, 'VALUE')
+            case 'data_changevariableby':
+                var = self.variable(target, block['fields']['VARIABLE'])
+                var[1] = to_number(var[1]) + to_number(self.evaluate(target, block, 'VALUE'))
+            case 'looks_say':
+                self.output.append(to_string(self.evaluate(target, block, 'MESSAGE')))
+            case 'sensing_askandwait':
+                self.questions.append(to_string(self.evaluate(target, block, 'QUESTION')))
+                answer = next(self.answers, None)
+                if answer is None:
+                    raise NoAnswersLeft(f'Ran out of scripted answers for question {self.questions[-1]!r}!')
+                # The answer is only picked up by the VM on a later frame.
+                yield
+                self.answer = str(answer)
+            case opcode:
+                raise UnsupportedOpcode(f'{opcode} is not supported by the interpreter.')
+
+    def evaluate(self, target: dict, block: dict, name: str):
+        if name not in block['inputs']:
+            return ''
+        value = block['inputs'][name]
+        match value:
+            case [_, [12, _, _] as field, *_]:
+                self.opcodes['data_variable'] += 1
+                return self.variable(target, field[1:])[1]
+            case [1, [_, literal, *_]]:
+                return literal
+            case [_, str() as block_id, *_]:
+                return self.report(target, target['blocks'][block_id])
+            case [3, None, [_, literal, *_]]:
+                return literal
+            case _:
+                raise UnsupportedOpcode(f'Unsupported input {value!r}.')
+
+    def report(self, target: dict, block: dict):
+        self.opcodes[block['opcode']] += 1
+        arg = lambda name: self.evaluate(target, block, name)
+        num = lambda name: to_number(arg(name))
+        match block['opcode']:
+            case 'sensing_answer':
+                return self.answer
+            case 'operator_add':
+                return num('NUM1') + num('NUM2')
+            case 'operator_subtract':
+                return num('NUM1') - num('NUM2')
+            case 'operator_multiply':
+                return num('NUM1') * num('NUM2')
+            case 'operator_divide':
+                return js_divide(num('NUM1'), num('NUM2'))
+            case 'operator_mod':
+                return js_mod(num('NUM1'), num('NUM2'))
+            case 'operator_round':
+                return float(math.floor(num('NUM') + 0.5))
+            case 'operator_join':
+                return to_string(arg('STRING1')) + to_string(arg('STRING2'))
+            case 'operator_letter_of':
+                index, string = int(num('LETTER')) - 1, to_string(arg('STRING'))
+                return string[index] if 0 <= index < len(string) else ''
+            case 'operator_length':
+                return len(to_string(arg('STRING')))
+            case 'operator_contains':
+                return to_string(arg('STRING2')).lower() in to_string(arg('STRING1')).lower()
+            case 'operator_lt':
+                return compare(arg('OPERAND1'), arg('OPERAND2')) < 0
+            case 'operator_gt':
+                return compare(arg('OPERAND1'), arg('OPERAND2')) > 0
+            case 'operator_equals':
+                return compare(arg('OPERAND1'), arg('OPERAND2')) == 0
+            case 'operator_and':
+                return to_boolean(arg('OPERAND1')) and to_boolean(arg('OPERAND2'))
+            case 'operator_or':
+                return to_boolean(arg('OPERAND1')) or to_boolean(arg('OPERAND2'))
+            case 'operator_not':
+                return not to_boolean(arg('OPERAND'))
+            case opcode:
+                raise UnsupportedOpcode(f'{opcode} is not supported by the interpreter.')
+
+def load_project(project: Project | dict | str | os.PathLike) -> dict:
+    match project:
+        case Project():
+            if project.project_json is None:
+                raise ProjectNotBuilt('Project has not been built yet, call `Project.build()` first!')
+            return json.loads(project.project_json)
+        case dict():
+            return project
+        case str() if project.lstrip().startswith('{'):
+            return json.loads(project)
+    path = (pathlib.Path(main_dir) / project).resolve()
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as f:
+            return json.loads(f.read('project.json'))
+    return json.loads(path.read_text())
+
+def run(project: Project | dict | str | os.PathLike, answers: Iterable[str] = (), max_frames: int = 10_000):
+    return Interpreter(load_project(project), answers).run(max_frames)
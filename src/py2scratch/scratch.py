@@ -1,7 +1,10 @@
-import json, hashlib, os, sys, pathlib, zipfile, io, warnings, mutagen
+import json, hashlib, os, sys, pathlib, zipfile, io, warnings, mutagen, re, glob, copy
+from concurrent.futures import ThreadPoolExecutor
 from functools import reduce
 from typing import NamedTuple, Callable
 from .scratch_code import parse_func
+from .code.blocks import reset_state, reset_inline_blocks
+from .code.utils import gen_random_id
 from .errors import *
 from PIL import Image
 
@@ -9,47 +12,104 @@ type ScratchObj = Sprite | Stage
 FileData = NamedTuple('FileData', [('ext', str), ('data', bytes), ('hash', str)])
 main_dir = os.path.dirname(sys.argv[0])
 
-data: list[FileData] = []
+# Shared between every project built in this process, keyed by `md5ext`.
+data: dict[str, FileData] = {}
+probes: dict[str, dict] = {}
+# Keyed by every function of a project in order, since a script's variable IDs depend on its siblings.
+compiled_funcs: dict[tuple[Callable, ...], dict[Callable, dict]] = {}
+# (resolved path, mtime) -> (bytes, md5), so the same file is only read and hashed once.
+asset_paths: dict[tuple[pathlib.Path, int], tuple[bytes, str]] = {}
 
 class Project:
     def __init__(self, dependencies: list[ScratchObj] = []):
         self.dependencies = dependencies
+        self.project_json: str | None = None
     
     def add(self, obj):
         self.dependencies.append(obj)
     
-    def build(self, filename: str = 'output.sb3'):
+    def compile(self):
         extensions = []
         targets = []
         monitors = []
         meta = {'semver': '3.0.0', 'vm': '2.3.4', 'agent': 'Py2Scratch'}
         
+        compiled = compile_funcs(tuple(dict.fromkeys(func for dependency in self.dependencies for func in dependency.funcs)))
+        scripts = {}
+        seen = set()
+        for dependency in self.dependencies:
+            scripts[dependency] = target_scripts(dependency.funcs, compiled, seen)
+        all_variables = {}
+        for dependency_scripts in scripts.values():
+            for _, blocks in dependency_scripts:
+                all_variables |= script_variables(blocks)
+        
         for dependency in self.dependencies:
             match dependency:
                 case Stage():
-                    from .code.blocks import all_variables
                     dependency.variables = {k: [v, ""] for k, v in all_variables.items()}
                     if not dependency.costumes:
                         raise NoCostumeProvided(f'{dependency.name} must have at least 1 costume!')
-                    targets.append(dependency.json())
+                    targets.append(dependency.json(scripts[dependency]))
                 case Sprite():
                     if not dependency.costumes:
                         raise NoCostumeProvided(f'{dependency.name} must have at least 1 costume!')
-                    targets.append(dependency.json())
+                    targets.append(dependency.json(scripts[dependency]))
         
-        project_json = json.dumps({
+        self.project_json = json.dumps({
             'extensions': extensions,
             'targets': targets,
             'monitors': monitors,
             'meta': meta
         })
+        return self.project_json
+    
+    def assets(self):
+        return {asset.md5ext for dependency in self.dependencies for asset in [*dependency.costumes, *dependency.sounds]}
+    
+    def build(self, filename: str = 'output.sb3'):
+        project_json = self.compile()
+        write_sb3((pathlib.Path(main_dir) / filename).resolve(), project_json, self.assets())
 
-        zip_dir = (pathlib.Path(main_dir) / filename).resolve()
-        
-        with zipfile.ZipFile(zip_dir, 'w') as f:
-            for file in data:
-                f.writestr(file.hash + '.' + file.ext, file.data)
-            f.writestr('project.json', project_json)
+
+class BuildResult(NamedTuple):
+    name: str
+    path: pathlib.Path
+    error: Exception | None = None
+    
+    @property
+    def ok(self):
+        return self.error is None
+
+def write_sb3(zip_dir: pathlib.Path, project_json: str, md5exts: set[str]):
+    with zipfile.ZipFile(zip_dir, 'w') as f:
+        for md5ext in sorted(md5exts):
+            f.writestr(md5ext, data[md5ext].data)
+        f.writestr('project.json', project_json)
+
+def build_many(projects: dict[str, Project] | list[Project], out_dir: os.PathLike = '.', workers: int | None = None) -> list[BuildResult]:
+    named = projects.items() if isinstance(projects, dict) else ((f'project{idx}', project) for idx, project in enumerate(projects, 1))
+    out_dir = (pathlib.Path(main_dir) / out_dir).resolve()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    
+    # The compiler keeps module-level state, so compiling stays on this thread; every
+    # project hits the same function/probe caches and only the archive writes are threaded.
+    results: list[BuildResult] = []
+    jobs = {}
+    for name, project in named:
+        path = out_dir / (name if name.endswith('.sb3') else name + '.sb3')
+        try:
+            jobs[len(results)] = (path, project.compile(), project.assets())
+            results.append(BuildResult(name, path))
+        except Exception as error:
+            results.append(BuildResult(name, path, error))
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {idx: pool.submit(write_sb3, *job) for idx, job in jobs.items()}
+        for idx, future in futures.items():
+            if (error := future.exception()) is not None:
+                results[idx] = results[idx]._replace(error=error)
+    return results
 
 
 class Target:
@@ -66,10 +126,16 @@ class Target:
         self.costumes: list[Costume] = []
         self.sounds: list[Sound] = []
         self.funcs: list[Callable] = []
+        
+        self.scripts: list[tuple[Callable, dict]] = []
+        self.compiled: dict | None = None
     
-    def json(self):
-        scratch_code_data = reduce(lambda a, b: a | b, (parse_func(func) for func in self.funcs), {})
-        return {
+    def json(self, scripts: list[tuple[Callable, dict]] | None = None):
+        if scripts is None:
+            scripts = target_scripts(self.funcs, compile_funcs(tuple(dict.fromkeys(self.funcs))), set())
+        self.scripts = scripts
+        scratch_code_data = reduce(lambda a, b: a | b, (blocks for _, blocks in self.scripts), {})
+        self.compiled = {
             'variables': self.variables,
             'lists': self.lists,
             'broadcasts': {},
@@ -81,6 +147,22 @@ class Target:
             'layerOrder': self.layer_order,
             'volume': self.volume
         }
+        return self.compiled
+    
+    def add_costumes_from(self, dir_or_glob: os.PathLike, workers: int | None = None):
+        costumes = load_assets(Costume, find_assets(dir_or_glob, Costume.EXTENSIONS), workers)
+        self.costumes.extend(costumes)
+        return costumes
+    
+    def add_sounds_from(self, dir_or_glob: os.PathLike, workers: int | None = None):
+        sounds = load_assets(Sound, find_assets(dir_or_glob, Sound.EXTENSIONS), workers)
+        self.sounds.extend(sounds)
+        return sounds
+    
+    def add_costumes_from_sheet(self, path: os.PathLike, frame_width: int, frame_height: int, count: int | None = None, workers: int | None = None):
+        costumes = slice_sheet(path, frame_width, frame_height, count, workers)
+        self.costumes.extend(costumes)
+        return costumes
 
 class RotationStyles:
     ALL_AROUND = 'all around'
@@ -113,8 +195,11 @@ class Sprite(Target):
         self.sounds: list[Sound] = []
         self.funcs: list[Callable] = []
         
-    def json(self):
-        target_json = super().json()
+        self.scripts: list[tuple[Callable, dict]] = []
+        self.compiled: dict | None = None
+        
+    def json(self, scripts: list[tuple[Callable, dict]] | None = None):
+        target_json = super().json(scripts)
         target_json['isStage'] = False
         target_json['name'] = self.name
         target_json['x'] = self.x
@@ -130,63 +215,209 @@ class Stage(Target):
     def __init__(self) -> None:
         super().__init__('Stage', 0)
     
-    def json(self):
-        target_json = super().json()
+    def json(self, scripts: list[tuple[Callable, dict]] | None = None):
+        target_json = super().json(scripts)
         target_json['isStage'] = True
         target_json['name'] = 'Stage'
         return target_json
 
 
 class Asset:
-    def __init__(self, name: str, path: os.PathLike) -> None:
-        global data
-        
+    def __init__(self, name: str, path: os.PathLike, data: bytes | None = None) -> None:
         self.name = name
-        self.path = path
-        self.filename, self.extension = path.rsplit('/', 1)[1].rsplit('.')
+        self.path = pathlib.Path(path)
+        self.filename, self.extension = self.path.stem, self.path.suffix.lstrip('.').lower()
         
-        asset_path = (pathlib.Path(main_dir) / path).resolve()
-        
-        self.data = bytes()
-        with open(asset_path, "rb") as f:
-            self.data = f.read()
-        self.hash = hashlib.md5(self.data).hexdigest()
+        if data is None:
+            self.data, self.hash = read_asset(self.path)
+        else:
+            self.data, self.hash = data, hashlib.md5(data).hexdigest()
+        self.md5ext = self.hash + '.' + self.extension
 
-        data.append(FileData(ext=self.extension, data=self.data, hash=self.hash))
+        register_asset(FileData(ext=self.extension, data=self.data, hash=self.hash))
+    
+    @classmethod
+    def load(cls, path: os.PathLike, name: str | None = None):
+        asset = cls(name or pathlib.Path(path).stem, path)
+        asset.probe()
+        return asset
+    
+    def probe(self):
+        if self.md5ext not in probes:
+            probes[self.md5ext] = self.measure()
+        return probes[self.md5ext]
+    
+    def measure(self):
+        return {}
     
     def json(self):
         return {
             'assetId': self.hash,
             'name': self.name,
-            'md5ext': self.hash + '.' + self.extension,
+            'md5ext': self.md5ext,
             'dataFormat': self.extension,   
         }
 
 class Costume(Asset):
-    def json(self):
-        asset_json = super().json()
-        asset_json['bitmapResolution'] = 1
+    EXTENSIONS = ('png', 'jpg', 'jpeg', 'bmp', 'gif', 'svg')
+    
+    def measure(self):
         try:
             image = Image.open(io.BytesIO(self.data))
-            asset_json['rotationCenterX'] = image.width // 2
-            asset_json['rotationCenterY'] = image.height // 2
+            return {'rotationCenterX': image.width // 2, 'rotationCenterY': image.height // 2}
         except:
-            image = None
             warnings.warn("WARNING: Pillow does not support SVG centering, Your vector sprite might not be centered", ResourceWarning)
-            asset_json['rotationCenterX'] = 0
-            asset_json['rotationCenterY'] = 0
+            return {'rotationCenterX': 0, 'rotationCenterY': 0}
+    
+    def json(self):
+        asset_json = super().json()
+        asset_json['bitmapResolution'] = 1
+        asset_json |= self.probe()
         return asset_json
 
 
 class Sound(Asset):
-    def json(self):
-        asset_json = super().json()
-        asset_json['bitmapResolution'] = 1
+    EXTENSIONS = ('wav', 'mp3')
+    
+    def measure(self):
         try:
-            soundtrack = mutagen.File(io.BytesIO(self.data))
-            sound_info = soundtrack.info
-            asset_json['rate'] = sound_info.sample_rate
-            asset_json['sampleCount'] = round(sound_info.sample_rate * sound_info.length)
+            sound_info = mutagen.File(io.BytesIO(self.data)).info
+            return {'rate': sound_info.sample_rate, 'sampleCount': round(sound_info.sample_rate * sound_info.length)}
         except:
             raise InvalidAudioFile("Please pass in a proper audio file!")
-        return asset_json
\ No newline at end of file
+    
+    def json(self):
+        asset_json = super().json()
+        asset_json['bitmapResolution'] = 1
+        asset_json |= self.probe()
+        return asset_json
+
+
+def register_asset(file: FileData):
+    data.setdefault(file.hash + '.' + file.ext, file)
+
+def read_asset(path: os.PathLike) -> tuple[bytes, str]:
+    asset_path = (pathlib.Path(main_dir) / path).resolve()
+    key = (asset_path, asset_path.stat().st_mtime_ns)
+    if key not in asset_paths:
+        content = asset_path.read_bytes()
+        asset_paths[key] = (content, hashlib.md5(content).hexdigest())
+    return asset_paths[key]
+
+def compile_funcs(funcs: tuple[Callable, ...]) -> dict[Callable, dict]:
+    """ Compiles `funcs` in order as one program, so a name set in one script can be read in another. """
+    if funcs not in compiled_funcs:
+        reset_state()
+        compiled = {}
+        for func in funcs:
+            # Inline blocks left over from the previous function break `Hat._add_inline`.
+            reset_inline_blocks()
+            compiled[func] = parse_func(func)
+        compiled_funcs[funcs] = compiled
+    return compiled_funcs[funcs]
+
+def target_scripts(funcs: list[Callable], compiled: dict[Callable, dict], seen: set[Callable]) -> list[tuple[Callable, dict]]:
+    """ The scripts of one target, functions already in `seen` get their own block and variable IDs. """
+    reused = [func for func in funcs if func in seen]
+    variable_ids = {}
+    for func in reused:
+        for block in compiled[func].values():
+            if block['opcode'] == 'data_setvariableto':
+                variable_ids.setdefault(block['fields']['VARIABLE'][1], gen_random_id())
+    
+    scripts = []
+    for func in funcs:
+        blocks = compiled[func]
+        if func in seen or variable_ids:
+            blocks = rekey_script(blocks, variable_ids, new_block_ids=func in seen)
+        seen.add(func)
+        scripts.append((func, blocks))
+    return scripts
+
+def rekey_script(blocks: dict, variable_ids: dict[str, str], new_block_ids: bool = True) -> dict:
+    block_ids = {idx: gen_random_id() if new_block_ids else idx for idx in blocks}
+    rekeyed = {}
+    for idx, block in blocks.items():
+        block = copy.deepcopy(block)
+        for key in ('next', 'parent'):
+            if block.get(key) in block_ids:
+                block[key] = block_ids[block[key]]
+        for name, value in block['inputs'].items():
+            match value:
+                case [kind, str() as input_id, *rest] if input_id in block_ids:
+                    block['inputs'][name] = [kind, block_ids[input_id], *rest]
+                case [kind, [12, var_name, var_id], *rest] if var_id in variable_ids:
+                    block['inputs'][name] = [kind, [12, var_name, variable_ids[var_id]], *rest]
+        if 'VARIABLE' in block['fields']:
+            var_name, var_id = block['fields']['VARIABLE'][:2]
+            block['fields']['VARIABLE'] = [var_name, variable_ids.get(var_id, var_id)]
+        rekeyed[block_ids[idx]] = block
+    return rekeyed
+
+def script_variables(blocks: dict) -> dict[str, str]:
+    found = {}
+    for block in blocks.values():
+        if 'VARIABLE' in block['fields']:
+            name, idx = block['fields']['VARIABLE'][:2]
+            found[idx] = name
+        for value in block['inputs'].values():
+            match value:
+                case [1, *_]:
+                    continue
+                case [_, [12, name, idx], *_]:
+                    found[idx] = name
+    return found
+
+def natural_key(path: pathlib.Path):
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', str(path))]
+
+def find_assets(dir_or_glob: os.PathLike, extensions: tuple[str, ...]) -> list[pathlib.Path]:
+    """ Files in a directory, or matching a glob (`**` recurses), with one of `extensions`. """
+    base = pathlib.Path(main_dir).resolve()
+    pattern = pathlib.Path(dir_or_glob)
+    if (base / pattern).is_dir():
+        paths = [path for path in (base / pattern).iterdir() if path.is_file()]
+    else:
+        paths = [pathlib.Path(path) for path in glob.glob(str(base / pattern), recursive=True)]
+    paths = [path for path in paths if path.is_file() and path.suffix.lstrip('.').lower() in extensions]
+    if not paths:
+        raise FileNotFoundError(f'No {"/".join(extensions)} files found for {str(dir_or_glob)!r}!')
+    return sorted(paths, key=natural_key)
+
+def load_assets(asset_type: type[Asset], paths: list[pathlib.Path], workers: int | None = None) -> list[Asset]:
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(asset_type.load, paths))
+
+# Image modes Pillow can write to a PNG as-is, anything else (CMYK, YCbCr, ...) is converted to RGBA.
+PNG_MODES = {'1', 'L', 'LA', 'I', 'I;16', 'P', 'RGB', 'RGBA'}
+
+def slice_sheet(path: os.PathLike, frame_width: int, frame_height: int, count: int | None = None, workers: int | None = None) -> list[Costume]:
+    path = pathlib.Path(path)
+    sheet = Image.open((pathlib.Path(main_dir) / path).resolve())
+    sheet.load()
+    if sheet.mode not in PNG_MODES:
+        sheet = sheet.convert('RGBA')
+    
+    if frame_width <= 0 or frame_height <= 0:
+        raise InvalidSpriteSheet(f'Frame size must be positive, got {frame_width}x{frame_height}!')
+    if frame_width > sheet.width or frame_height > sheet.height:
+        raise InvalidSpriteSheet(f'{frame_width}x{frame_height} frames do not fit in the {sheet.width}x{sheet.height} sheet {str(path)!r}!')
+    boxes = [
+        (x, y, x + frame_width, y + frame_height)
+        for y in range(0, sheet.height - frame_height + 1, frame_height)
+        for x in range(0, sheet.width - frame_width + 1, frame_width)
+    ]
+    if count is not None and not 0 < count <= len(boxes):
+        raise InvalidSpriteSheet(f'{str(path)!r} has {len(boxes)} frames of {frame_width}x{frame_height}, can\'t take {count}!')
+    boxes = boxes[:count]
+    
+    def cut(idx_box: tuple[int, tuple[int, int, int, int]]):
+        idx, box = idx_box
+        buffer = io.BytesIO()
+        sheet.crop(box).save(buffer, 'PNG')
+        costume = Costume(f'{path.stem}{idx + 1}', path.with_name(f'{path.stem}{idx + 1}.png'), buffer.getvalue())
+        costume.probe()
+        return costume
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(cut, enumerate(boxes)))
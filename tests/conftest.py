@@ -0,0 +1,18 @@
+import pytest
+from PIL import Image
+from py2scratch import Project, Stage, Sprite, Costume
+
+@pytest.fixture
+def make_project(tmp_path):
+    """ Builds a Stage + `Cat` sprite project running `funcs`, with its images in `tmp_path`. """
+    Image.new('RGB', (480, 360)).save(tmp_path / 'bg.png')
+    Image.new('RGB', (20, 20)).save(tmp_path / 'cat.png')
+
+    def make(*funcs):
+        stage = Stage()
+        stage.costumes.append(Costume('bg', tmp_path / 'bg.png'))
+        sprite = Sprite('Cat')
+        sprite.costumes.append(Costume('cat', tmp_path / 'cat.png'))
+        sprite.funcs.extend(funcs)
+        return Project([stage, sprite])
+    return make
@@ -0,0 +1,92 @@
+import json
+import pytest
+from py2scratch import Costume, analyze, analyze_target, analysis
+from py2scratch.errors import ProjectNotBuilt
+
+def _flag_clicked(sprite):
+    print('hi')
+    name = input('who?')
+    print(name)
+
+LOCATION = f'{__file__}:{_flag_clicked.__code__.co_firstlineno}'
+
+@pytest.fixture
+def project(make_project, tmp_path):
+    project = make_project(_flag_clicked)
+    project.build(tmp_path / 'out.sb3')
+    return project
+
+def test_script_report(project):
+    report = analyze(project, warn=False)
+    script, = report.targets[1].scripts
+
+    assert script.func is _flag_clicked
+    assert script.location == LOCATION
+    assert script.hat_opcode == 'event_whenflagclicked'
+    assert script.opcodes['looks_say'] == 2
+    assert script.opcodes['sensing_askandwait'] == 1
+    assert script.opcodes['data_variable'] == 2
+    # Two `print` return values and one `input` return value.
+    assert script.temp_variables == 3
+    assert len(script.frame_costs) == 2
+    assert sum(script.frame_costs) == script.block_count
+    assert report.warnings == []
+
+def test_sizes(project):
+    report = analyze(project, warn=False)
+    stage, sprite = project.dependencies
+
+    assert report.serialized_bytes == len(project.project_json.encode())
+    assert report.targets[1].serialized_bytes == len(json.dumps(sprite.compiled).encode())
+    assert report.targets[0].asset_bytes == len(stage.costumes[0].data)
+    assert report.asset_bytes == len(stage.costumes[0].data) + len(sprite.costumes[0].data)
+
+def test_shared_asset_counted_once(make_project, tmp_path):
+    project = make_project(_flag_clicked)
+    project.dependencies[1].costumes.append(Costume('bg', tmp_path / 'bg.png'))
+    project.build(tmp_path / 'out.sb3')
+    report = analyze(project, warn=False)
+
+    assert sum(target.asset_bytes for target in report.targets) > report.asset_bytes
+    assert report.asset_bytes == sum({asset.hash: len(asset.data) for target in project.dependencies for asset in target.costumes}.values())
+
+def test_frame_cost_warning(project, monkeypatch):
+    monkeypatch.setattr(analysis, 'FRAME_COST_LIMIT', 1)
+    with pytest.warns(ResourceWarning, match='_flag_clicked'):
+        report = analyze(project)
+
+    warning, = report.warnings
+    assert warning.startswith(f'`_flag_clicked` ({LOCATION}) of Cat runs ~')
+    assert f'WARNING: {warning}' in str(report)
+
+def test_project_json_warning(project, monkeypatch):
+    monkeypatch.setattr(analysis, 'PROJECT_JSON_LIMIT', 100)
+    warning, = analyze(project, warn=False).warnings
+
+    assert warning.startswith(f'project.json is {len(project.project_json.encode())} bytes')
+    assert f'Largest script is `_flag_clicked` ({LOCATION})' in warning
+
+def test_asset_warning(project, monkeypatch):
+    sprite = project.dependencies[1]
+    monkeypatch.setattr(analysis, 'ASSET_LIMIT', len(sprite.costumes[0].data))
+    warnings = analyze(project, warn=False).warnings
+
+    assert f"Asset 'cat' ({sprite.costumes[0].path}) of Cat is {len(sprite.costumes[0].data)} bytes" in warnings[-1]
+
+def test_not_built(make_project):
+    project = make_project(_flag_clicked)
+    with pytest.raises(ProjectNotBuilt):
+        analyze(project)
+    with pytest.raises(ProjectNotBuilt):
+        analyze_target(project.dependencies[1])
+
+def test_empty_and_block_inputs():
+    blocks = {
+        'hat': {'opcode': 'event_whenflagclicked', 'next': 'say', 'parent': None, 'inputs': {}, 'fields': {}, 'topLevel': True},
+        'say': {'opcode': 'looks_say', 'next': None, 'parent': 'hat', 'fields': {}, 'topLevel': False,
+                'inputs': {'MESSAGE': [3, None, [10, 'hi']]}},
+    }
+    script = analysis.analyze_script(_flag_clicked, blocks)
+
+    assert 'data_variable' not in script.opcodes
+    assert script.frame_costs == [2]
@@ -0,0 +1,53 @@
+import io
+import pytest
+from PIL import Image
+from py2scratch import Sprite
+from py2scratch.errors import InvalidSpriteSheet
+
+def make_frames(directory, names):
+    directory.mkdir(parents=True, exist_ok=True)
+    for idx, name in enumerate(names):
+        Image.new('RGB', (10 + idx, 20)).save(directory / name)
+
+def test_costumes_keep_natural_order(tmp_path):
+    make_frames(tmp_path / 'frames', ['f10.png', 'f2.png', 'f1.png'])
+    sprite = Sprite('Cat')
+    costumes = sprite.add_costumes_from(tmp_path / 'frames')
+    assert [costume.name for costume in costumes] == ['f1', 'f2', 'f10']
+    assert sprite.costumes == costumes
+
+def test_extension_is_lowercased(tmp_path):
+    make_frames(tmp_path, ['F1.PNG'])
+    costume, = Sprite('Cat').add_costumes_from(tmp_path / '*.PNG')
+    assert costume.json()['dataFormat'] == 'png'
+    assert costume.json()['md5ext'].endswith('.png')
+
+def test_recursive_glob(tmp_path):
+    make_frames(tmp_path / 'a', ['f1.png'])
+    make_frames(tmp_path / 'b' / 'c', ['f2.png'])
+    costumes = Sprite('Cat').add_costumes_from(tmp_path / '**' / '*.png')
+    assert [costume.name for costume in costumes] == ['f1', 'f2']
+
+def test_nothing_matched_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        Sprite('Cat').add_costumes_from(tmp_path / 'missing')
+    with pytest.raises(FileNotFoundError):
+        Sprite('Cat').add_costumes_from(tmp_path / '*.png')
+
+def test_sprite_sheet_is_sliced_in_order(tmp_path):
+    Image.new('RGB', (64, 32)).save(tmp_path / 'sheet.png')
+    costumes = Sprite('Cat').add_costumes_from_sheet(tmp_path / 'sheet.png', 16, 16, count=6)
+    assert [costume.name for costume in costumes] == [f'sheet{idx}' for idx in range(1, 7)]
+    assert costumes[0].json()['rotationCenterX'] == 8
+
+@pytest.mark.parametrize('width, height, count', [(0, 16, None), (16, -1, None), (128, 16, None), (16, 64, None), (16, 16, 9), (16, 16, 0)])
+def test_sprite_sheet_rejects_bad_frames(tmp_path, width, height, count):
+    Image.new('RGB', (64, 32)).save(tmp_path / 'sheet.png')
+    with pytest.raises(InvalidSpriteSheet):
+        Sprite('Cat').add_costumes_from_sheet(tmp_path / 'sheet.png', width, height, count=count)
+
+def test_cmyk_sprite_sheet(tmp_path):
+    Image.new('CMYK', (32, 16)).save(tmp_path / 'sheet.jpg')
+    costumes = Sprite('Cat').add_costumes_from_sheet(tmp_path / 'sheet.jpg', 16, 16)
+    assert [costume.json()['dataFormat'] for costume in costumes] == ['png', 'png']
+    assert Image.open(io.BytesIO(costumes[0].data)).mode == 'RGBA'
@@ -0,0 +1,68 @@
+import importlib.util, json, zipfile
+from py2scratch import Project, Sprite, Costume, build_many, run
+
+def load_module(tmp_path, name, body):
+    path = tmp_path / f'{name}.py'
+    path.write_text('def _flag_clicked(sprite):\n' + ''.join(f'    {line}\n' for line in body))
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module._flag_clicked
+
+def load_variant(tmp_path, idx):
+    return load_module(tmp_path, f'variant{idx}', [f"print('level {idx}')", "name = input('who?')", 'print(name)'])
+
+def test_build_many_variants_with_own_functions(tmp_path, make_project):
+    projects = {f'level{idx}': make_project(load_variant(tmp_path, idx)) for idx in range(5)}
+    projects['broken'] = Project([Sprite('Empty')])
+
+    results = build_many(projects, tmp_path / 'out', workers=2)
+
+    assert [result.name for result in results] == [*(f'level{idx}' for idx in range(5)), 'broken']
+    assert all(result.ok for result in results[:-1]), [result.error for result in results]
+    assert not results[-1].ok
+    stage_variables = []
+    for result in results[:-1]:
+        with zipfile.ZipFile(result.path) as f:
+            project_json = json.loads(f.read('project.json'))
+            assert len(f.namelist()) == 3
+        stage_variables.append(len(project_json['targets'][0]['variables']))
+    # Each project only carries the variables of its own scripts.
+    assert len(set(stage_variables)) == 1
+
+def test_build_many_compiles_shared_function_once(tmp_path, make_project):
+    func = load_variant(tmp_path, 'shared')
+    projects = [make_project(func) for _ in range(3)]
+
+    results = build_many(projects, tmp_path / 'out')
+
+    assert all(result.ok for result in results)
+    blocks = [project.dependencies[1].compiled['blocks'] for project in projects]
+    assert blocks[0] == blocks[1] == blocks[2]
+
+def test_variable_shared_between_scripts(tmp_path, make_project):
+    setter = load_module(tmp_path, 'setter', ["x = 'hi'"])
+    reader = load_module(tmp_path, 'reader', ['print(x)'])
+    project = make_project(setter, reader)
+
+    project.build(tmp_path / 'out.sb3')
+
+    assert run(project).output == ['hi']
+
+def test_function_reused_on_two_sprites(tmp_path, make_project):
+    func = load_variant(tmp_path, 'reused')
+    project = make_project(func)
+    dog = Sprite('Dog')
+    dog.costumes.append(Costume('cat', tmp_path / 'cat.png'))
+    dog.funcs.append(func)
+    project.add(dog)
+
+    project.build(tmp_path / 'out.sb3')
+
+    cat_blocks, dog_blocks = (target.compiled['blocks'] for target in project.dependencies[1:])
+    assert not cat_blocks.keys() & dog_blocks.keys()
+    set_ids = lambda blocks: {block['fields']['VARIABLE'][1] for block in blocks.values() if 'VARIABLE' in block['fields']}
+    assert not set_ids(cat_blocks) & set_ids(dog_blocks)
+    assert set_ids(cat_blocks) | set_ids(dog_blocks) <= project.dependencies[0].variables.keys()
+    result = run(project, ['Tom', 'Rex'])
+    assert result.output == ['level reused', 'level reused', 'Tom', 'Rex']
@@ -0,0 +1,139 @@
+import math
+import pytest
+from py2scratch import analyze, analysis, run
+from py2scratch.errors import NoAnswersLeft, UnsupportedOpcode
+from py2scratch.interpreter import js_number, to_number, to_string, to_boolean, compare, js_mod, js_divide
+
+@pytest.mark.parametrize('value, expected', [
+    ('12', 12.0), (' 12\n', 12.0), ('-1.5e3', -1500.0), ('.5', 0.5), ('5.', 5.0),
+    ('0x1f', 31.0), ('0b101', 5.0), ('0o17', 15.0), ('Infinity', math.inf), ('-Infinity', -math.inf),
+    ('', 0.0), (True, 1.0),
+])
+def test_js_number(value, expected):
+    assert js_number(value) == expected
+
+@pytest.mark.parametrize('value', ['abc', '١٢', '1_0', '0x1_f', 'inf', 'nan', '1e', '\x1c1'])
+def test_js_number_nan(value):
+    assert math.isnan(js_number(value))
+    assert to_number(value) == 0
+
+@pytest.mark.parametrize('value, expected', [
+    (3.0, '3'), (-0.0, '0'), (0.1 + 0.2, '0.30000000000000004'), (1e-5, '0.00001'), (1e-6, '0.000001'),
+    (1e-7, '1e-7'), (1.5e-7, '1.5e-7'), (123456789012345680000.0, '123456789012345680000'),
+    (1e21, '1e+21'), (1.5e300, '1.5e+300'), (-12.5, '-12.5'), (math.nan, 'NaN'), (-math.inf, '-Infinity'),
+    (True, 'true'), ('hi', 'hi'),
+])
+def test_to_string(value, expected):
+    assert to_string(value) == expected
+
+@pytest.mark.parametrize('value, expected', [
+    ('', False), ('0', False), ('false', False), ('FALSE', False), ('no', True), (0.0, False), (math.nan, False), (2, True),
+])
+def test_to_boolean(value, expected):
+    assert to_boolean(value) is expected
+
+def test_compare():
+    assert compare('10', '9') > 0
+    assert compare('a', 'B') < 0
+    assert compare('', 0) != 0
+    assert compare('ABC', 'abc') == 0
+    assert compare('Infinity', 'Infinity') == 0
+
+@pytest.mark.parametrize('left, right, expected', [
+    (7, 3, 1), (-7, 3, 2), (7, -3, -2), (-3, math.inf, -3), (3, -math.inf, 3),
+])
+def test_js_mod(left, right, expected):
+    assert js_mod(left, right) == expected
+
+def test_js_mod_and_divide_by_zero():
+    assert math.isnan(js_mod(1, 0))
+    assert math.isnan(js_mod(math.inf, 2))
+    assert js_divide(1, 0) == math.inf
+    assert js_divide(-1, 0) == -math.inf
+    assert math.isnan(js_divide(0, 0))
+
+def _flag_clicked(sprite):
+    print('hi')
+    name = input('who?')
+    print(name)
+
+@pytest.fixture
+def project(make_project, tmp_path):
+    project = make_project(_flag_clicked)
+    project.build(tmp_path / 'out.sb3')
+    return project
+
+def test_run_built_project(project, tmp_path):
+    result = run(project, ['Bob'])
+
+    assert result.output == ['hi', 'Bob']
+    assert result.questions == ['who?']
+    assert result.frames == 2
+    assert result.finished
+    assert result.opcodes['event_whenflagclicked'] == 1
+    assert result.opcodes['sensing_askandwait'] == 1
+    assert result.opcodes['looks_say'] == 2
+    assert run(tmp_path / 'out.sb3', ['Al']).output == ['hi', 'Al']
+
+def test_run_matches_analyze(project):
+    result = run(project, ['Bob'])
+    script, = analyze(project, warn=False).targets[1].scripts
+
+    assert result.blocks == script.block_count == sum(script.frame_costs)
+    assert len(script.frame_costs) == result.frames
+
+def test_run_out_of_answers(project):
+    with pytest.raises(NoAnswersLeft):
+        run(project)
+
+def block(opcode, next=None, parent=None, top_level=False, **inputs):
+    return {'opcode': opcode, 'next': next, 'parent': parent, 'inputs': inputs, 'fields': {}, 'topLevel': top_level}
+
+def handwritten_project():
+    x = [3, [12, 'x', 'var-x'], [10, '']]
+    blocks = {
+        'hat': block('event_whenflagclicked', next='set', top_level=True),
+        'set': block('data_setvariableto', next='say1', parent='hat', VALUE=[3, 'add1', [10, '']]),
+        'add1': block('operator_add', parent='set', NUM1=[1, [4, '1']], NUM2=[1, [4, '2']]),
+        'say1': block('looks_say', next='say2', parent='set', MESSAGE=[3, 'join1', [10, '']]),
+        'join1': block('operator_join', parent='say1', STRING1=[1, [10, 'x=']], STRING2=x),
+        'say2': block('looks_say', next='say3', parent='say1', MESSAGE=[3, 'eq1', [10, '']]),
+        'eq1': block('operator_equals', parent='say2', OPERAND1=[3, 'mod1', [10, '']], OPERAND2=[1, [10, '2']]),
+        'mod1': block('operator_mod', parent='eq1', NUM1=[1, [4, '-7']], NUM2=[1, [4, '3']]),
+        'say3': block('looks_say', parent='say2', MESSAGE=[3, 'join2', [10, '']]),
+        'join2': block('operator_join', parent='say3', STRING1=[3, 'add2', [10, '']], STRING2=[1, [10, '!']]),
+        'add2': block('operator_add', parent='join2', NUM1=x, NUM2=[1, [4, '0.5']]),
+    }
+    blocks['set']['fields'] = {'VARIABLE': ['x', 'var-x']}
+    return {'targets': [
+        {'isStage': True, 'name': 'Stage', 'variables': {'var-x': ['x', 0]}, 'blocks': {}},
+        {'isStage': False, 'name': 'Cat', 'variables': {}, 'blocks': blocks},
+    ]}
+
+def test_run_operators():
+    project = handwritten_project()
+    result = run(project)
+
+    assert result.output == ['x=3', 'true', '3.5!']
+    assert result.variables['Stage'] == {'x': 3.0}
+    assert result.frames == 1
+    assert result.opcodes == {
+        'event_whenflagclicked': 1, 'data_setvariableto': 1, 'looks_say': 3, 'operator_add': 2,
+        'operator_join': 2, 'operator_equals': 1, 'operator_mod': 1, 'data_variable': 2,
+    }
+    # The input project is left untouched.
+    assert project['targets'][0]['variables'] == {'var-x': ['x', 0]}
+
+def test_run_operators_matches_analyze():
+    blocks = handwritten_project()['targets'][1]['blocks']
+    script = analysis.analyze_script(_flag_clicked, blocks)
+    result = run(handwritten_project())
+
+    assert script.opcodes == result.opcodes
+    assert script.frame_costs == [result.blocks]
+
+def test_run_unsupported_opcode():
+    project = handwritten_project()
+    project['targets'][1]['blocks']['mod1']['opcode'] = 'operator_mathop'
+    with pytest.raises(UnsupportedOpcode):
+        run(project)